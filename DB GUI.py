@@ -4,11 +4,18 @@ import customtkinter as ctk
 import tkinter as tk
 from tkinter import ttk
 from tkinter import messagebox
+from tkinter import filedialog
 from tkcalendar import DateEntry
 from dotenv import load_dotenv
 import os
 import sys
 import re
+import csv
+import datetime
+import unicodedata
+from array import array
+from contextlib import contextmanager
+from decimal import Decimal
 
 #%% User auth
 # Function to load the env
@@ -50,26 +57,28 @@ def connect():
     connection = psycopg2.connect(connStr)         
     return connection
 
-# Execute the command input
-def executeCommand(command, returnType=False, *params):
+# Open a cursor with the command executed on it, closing the connection after the block.
+# Named cursors are server side and run inside a transaction, so the server only
+# produces the rows that are fetched
+@contextmanager
+def openCursor(command, params, name=None):
     connection = None
     try:
         connection = connect()
-        connection.autocommit = True
+        connection.autocommit = name is None
         cur = connection.cursor()  
         cur.execute('set search_path to cmps_db')
         
+        if name is not None:
+            cur = connection.cursor(name=name)
+        
         # Execute command with parameters
         if params:
             cur.execute(command, params)
         else:
             cur.execute(command)
             
-        if returnType:
-            rows = cur.fetchall()
-            return rows
-        
-        return None
+        yield cur
             
     except Exception as e:
         print(e)
@@ -79,6 +88,367 @@ def executeCommand(command, returnType=False, *params):
         if connection:
             connection.close()
 
+# Execute the command input
+def executeCommand(command, returnType=False, *params):
+    # Returned rows are streamed in batches through a server side cursor
+    with openCursor(command, params, "resultCursor" if returnType else None) as cur:
+        if returnType:
+            results = ResultSet.fromCursor(cur)
+            results.query = command
+            results.params = params
+            return results
+        
+    return None
+
+# Stream the rows of a query straight into a csv file
+def exportCommand(file, headers, command, *params):
+    with openCursor(command, params, "exportCursor") as cur:
+        cur.itersize = FETCH_BATCH_SIZE
+        writer = csv.writer(file)
+        writer.writerow(headers)
+        for row in cur:
+            writer.writerow([formatValue(value) for value in row])
+
+#%% Result storage
+# Number of rows pulled from the server per round trip
+FETCH_BATCH_SIZE = 5000
+
+# Maximum rows held in memory, larger results are sorted and filtered on the server
+FETCH_LIMIT = 100000
+
+# Range of values that fit in a signed 64 bit array
+INT_MIN = -2 ** 63
+INT_MAX = 2 ** 63 - 1
+
+# Decimal places of a decimal that fits exactly in a float array, None if it does not
+def decimalPlaces(value):
+    if not isinstance(value, Decimal) or not value.is_finite():
+        return None
+    sign, digits, exponent = value.as_tuple()
+    if exponent > 0 or len(digits) > 15:
+        return None
+    return -exponent
+
+# Format a value the way PostgreSQL casts it to text, so filters match the same
+# whether they run in memory or on the server
+def formatValue(value):
+    if value is None:
+        return "None"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (datetime.datetime, datetime.time)):
+        offset = value.utcoffset()
+        value = value.replace(tzinfo=None)
+        text = value.isoformat(sep=" ") if isinstance(value, datetime.datetime) else value.isoformat()
+        if value.microsecond:
+            text = text.rstrip("0")
+        # PostgreSQL writes offsets as +HH, or +HH:MM when there are minutes
+        if offset is not None:
+            minutes = int(offset.total_seconds()) // 60
+            text += f"{'-' if minutes < 0 else '+'}{abs(minutes) // 60:02d}"
+            if abs(minutes) % 60:
+                text += f":{abs(minutes) % 60:02d}"
+        return text
+    return str(value)
+
+# Sort key approximating the database collation: accents and case are ignored
+# first, then used to break ties, with the raw string as the final tiebreak
+def collationKey(text):
+    folded = text.casefold()
+    base = "".join(char for char in unicodedata.normalize("NFKD", folded) if not unicodedata.combining(char))
+    return (base, folded, text)
+
+# Sort key for a dictionary encoded value, NaN sorts above every number like in PostgreSQL
+def sortKey(value):
+    if isinstance(value, str):
+        return (False, collationKey(value))
+    if isinstance(value, (float, Decimal)) and value != value:
+        return (True, 0)
+    return (False, value)
+
+# A single column of query results
+class ResultColumn:
+    """Column stored in a typed array.
+    Integers and decimals are kept as raw numbers, every other value is
+    dictionary encoded so repeated values are only stored once."""
+    def __init__(self):
+        self.kind = None
+        self.values = None
+        self.nulls = None
+        self.decimals = None
+        self.dictionary = []
+        self.formatted = []
+        self.lookup = {}
+        self.pending = 0
+        self.sortCache = {}
+        
+    def __len__(self):
+        if self.kind is None:
+            return self.pending
+        return len(self.values)
+    
+    # Pick the storage type from the first non null value
+    def start(self, value):
+        if type(value) is int and INT_MIN <= value <= INT_MAX:
+            self.kind = "int"
+            self.values = array('q')
+        elif type(value) is float:
+            self.kind = "float"
+            self.values = array('d')
+        elif decimalPlaces(value) is not None:
+            self.kind = "float"
+            self.values = array('d')
+            self.decimals = decimalPlaces(value)
+        else:
+            self.kind = "dict"
+            self.values = array('I')
+            
+        # Fill in any nulls seen before the first value
+        pending = self.pending
+        self.pending = 0
+        for _ in range(pending):
+            self.append(None)
+    
+    # Check a value can be stored in the numeric array
+    def fits(self, value):
+        if self.kind == "int":
+            return type(value) is int and INT_MIN <= value <= INT_MAX
+        if self.decimals is None:
+            return type(value) is float
+        return decimalPlaces(value) == self.decimals
+    
+    def append(self, value):
+        if self.kind is None:
+            if value is None:
+                self.pending += 1
+                return
+            self.start(value)
+            
+        if self.kind == "dict":
+            self.appendCode(value)
+        elif value is None:
+            if self.nulls is None:
+                self.nulls = bytearray(len(self.values))
+            self.nulls.append(1)
+            self.values.append(0)
+        elif self.fits(value):
+            if self.nulls is not None:
+                self.nulls.append(0)
+            self.values.append(value if self.kind == "int" else float(value))
+        else:
+            self.promote()
+            self.appendCode(value)
+            
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+    
+    # Strings are keyed directly, other values by type and text so equal values like 1.5 and 1.50 stay apart
+    def appendCode(self, value):
+        key = value if type(value) is str else (type(value), str(value))
+        code = self.lookup.get(key)
+        if code is None:
+            code = len(self.dictionary)
+            self.lookup[key] = code
+            self.dictionary.append(value)
+            self.formatted.append(None)
+        self.values.append(code)
+    
+    # Move a numeric column over to dictionary encoding
+    def promote(self):
+        values = [self.value(i) for i in range(len(self.values))]
+        self.kind = "dict"
+        self.values = array('I')
+        self.nulls = None
+        self.decimals = None
+        for value in values:
+            self.appendCode(value)
+    
+    # Drop the build lookup once all rows are in
+    def finish(self):
+        if self.kind is None:
+            self.kind = "dict"
+            self.values = array('I')
+            pending = self.pending
+            self.pending = 0
+            for _ in range(pending):
+                self.appendCode(None)
+        self.lookup = None
+    
+    def value(self, i):
+        if self.kind == "dict":
+            return self.dictionary[self.values[i]]
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        if self.decimals is not None:
+            return Decimal(f"{self.values[i]:.{self.decimals}f}")
+        return self.values[i]
+    
+    # Format a dictionary entry only when it is first needed
+    def codeText(self, code):
+        text = self.formatted[code]
+        if text is None:
+            text = formatValue(self.dictionary[code])
+            self.formatted[code] = text
+        return text
+    
+    def text(self, i):
+        if self.kind == "dict":
+            return self.codeText(self.values[i])
+        if self.nulls is not None and self.nulls[i]:
+            return "None"
+        if self.decimals is not None:
+            return f"{self.values[i]:.{self.decimals}f}"
+        return str(self.values[i])
+    
+    def maxTextLength(self):
+        if self.kind == "dict":
+            return max((len(self.codeText(code)) for code in range(len(self.dictionary))), default=0)
+        if not self.values:
+            return 0
+        if self.kind == "float" and self.decimals is None:
+            longest = max(len(str(value)) for value in self.values)
+        elif self.decimals is not None:
+            longest = max(len(f"{min(self.values):.{self.decimals}f}"), len(f"{max(self.values):.{self.decimals}f}"))
+        else:
+            longest = max(len(str(min(self.values))), len(str(max(self.values))))
+        if self.nulls is not None and any(self.nulls):
+            longest = max(longest, len("None"))
+        return longest
+    
+    # Row indexes in sorted order, nulls always last
+    def sortedRows(self, descending=False):
+        rows = self.sortCache.get(descending)
+        if rows is None:
+            rows = self.buildSortedRows(descending)
+            self.sortCache[descending] = rows
+        return rows
+    
+    def buildSortedRows(self, descending):
+        count = len(self.values)
+        if self.kind == "dict":
+            codes = [code for code, value in enumerate(self.dictionary) if value is not None]
+            try:
+                codes.sort(key=lambda code: sortKey(self.dictionary[code]), reverse=descending)
+            except TypeError:
+                codes.sort(key=lambda code: collationKey(self.codeText(code)), reverse=descending)
+            rank = array('I', [len(codes)]) * len(self.dictionary)
+            for position, code in enumerate(codes):
+                rank[code] = position
+            keys = array('I', map(rank.__getitem__, self.values))
+            return array('I', sorted(range(count), key=keys.__getitem__))
+        
+        values = self.values
+        rows = range(count) if self.nulls is None else [i for i in range(count) if not self.nulls[i]]
+        
+        # NaN never compares, so it is taken out and placed above every number like in PostgreSQL
+        nans = []
+        if self.kind == "float":
+            nans = [i for i in rows if values[i] != values[i]]
+            if nans:
+                rows = [i for i in rows if values[i] == values[i]]
+        
+        ordered = array('I', sorted(rows, key=values.__getitem__, reverse=descending))
+        if descending:
+            ordered = array('I', nans) + ordered
+        else:
+            ordered.extend(nans)
+        if self.nulls is not None:
+            ordered.extend(i for i in range(count) if self.nulls[i])
+        return ordered
+    
+    # Mask of rows whose text contains the search term (case insensitive), nulls never match like ilike on the server
+    def matchRows(self, searchTerm):
+        searchTerm = searchTerm.lower()
+        if self.kind == "dict":
+            hits = bytes(value is not None and searchTerm in self.codeText(code).lower() for code, value in enumerate(self.dictionary))
+            return bytearray(map(hits.__getitem__, self.values))
+        if self.nulls is None:
+            return bytearray(searchTerm in self.text(i).lower() for i in range(len(self.values)))
+        return bytearray(not self.nulls[i] and searchTerm in self.text(i).lower() for i in range(len(self.values)))
+
+# Query results stored column by column instead of as a list of row tuples
+class ResultSet:
+    def __init__(self, names):
+        self.names = list(names)
+        self.columns = [ResultColumn() for _ in self.names]
+        self.query = None
+        self.params = ()
+        self.complete = True
+        
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+    
+    # Build the result set straight from the cursor in batches, stopping at the limit
+    @classmethod
+    def fromCursor(cls, cursor, batchSize=FETCH_BATCH_SIZE, limit=FETCH_LIMIT):
+        batch = cursor.fetchmany(min(batchSize, limit))
+        resultSet = cls(column[0] for column in cursor.description or [])
+        while batch:
+            resultSet.extend(batch)
+            remaining = limit - len(resultSet)
+            if remaining <= 0:
+                resultSet.complete = cursor.fetchone() is None
+                break
+            batch = cursor.fetchmany(min(batchSize, remaining))
+        resultSet.finish()
+        return resultSet
+    
+    def extend(self, rows):
+        for j, column in enumerate(self.columns):
+            column.extend(row[j] for row in rows)
+            
+    def finish(self):
+        for column in self.columns:
+            column.finish()
+    
+    def text(self, i, j):
+        return self.columns[j].text(i)
+    
+    def sortedRows(self, columnIndex, descending=False):
+        return self.columns[columnIndex].sortedRows(descending)
+    
+    def matchRows(self, columnIndex, searchTerm):
+        return self.columns[columnIndex].matchRows(searchTerm)
+    
+    # Rows (in the given order) matching every (column, search term) filter
+    def filterRows(self, filters, rows=None):
+        if rows is None:
+            rows = range(len(self))
+        if not filters:
+            return rows
+        mask = None
+        for columnIndex, searchTerm in filters:
+            match = int.from_bytes(self.matchRows(columnIndex, searchTerm), "big")
+            mask = match if mask is None else mask & match
+        mask = mask.to_bytes(len(self), "big")
+        return array('I', filter(mask.__getitem__, rows))
+    
+    # Wrap the original query so the server does the sorting and filtering
+    def pushDownQuery(self, filters, sortColumn=None, descending=False, limit=None):
+        aliases = ", ".join(f"c{j}" for j in range(len(self.columns)))
+        sqlCommand = f"Select * from ({self.query}) as results({aliases})"
+        params = list(self.params)
+        if filters:
+            sqlCommand += " where " + " and ".join(f"cast(c{j} as text) ilike %s" for j, _ in filters)
+            for _, searchTerm in filters:
+                searchTerm = searchTerm.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                params.append(f"%{searchTerm}%")
+        if sortColumn is not None:
+            sqlCommand += f" order by c{sortColumn} {'desc' if descending else 'asc'} nulls last"
+        if limit is not None:
+            sqlCommand += " limit %s"
+            params.append(limit)
+        return sqlCommand, params
+    
+    # Write the formatted rows as csv, optionally in the order given by rows
+    def writeCsv(self, file, headers=None, rows=None):
+        writer = csv.writer(file)
+        writer.writerow(headers if headers else self.names)
+        if rows is None:
+            rows = range(len(self))
+        writer.writerows([column.text(i) for column in self.columns] for i in rows)
+
 #%% Validation Methods
 def validateTimeInput(char, timeEntry):
     if char == "":
@@ -187,22 +557,21 @@ def displayResults(results, commandName, *params):
     commandLabel.place(relx=0.5, rely=0.05, anchor="center")
     
     # Calculate required dimensions
+    colWidths = [min(column.maxTextLength() * 8 + 20, 200) for column in results.columns] if results else []
     if not results or len(results) == 0:
         popupWidth = 400
         popupHeight = 150
-    elif len(results) == 1 and len(results[0]) == 1:
-        content_width = max(400, len(str(results[0][0])) * 8 + 60)
+    elif len(results) == 1 and len(results.columns) == 1:
+        content_width = max(400, len(results.text(0, 0)) * 8 + 60)
         popupWidth = min(content_width, resultPopup.winfo_screenwidth() - 100)
-        popupHeight = 200
+        popupHeight = 250
     else:
-        colWidths = [max(len(str(row[i])) for row in results for i in range(len(results[0]))) for i in range(len(results[0]))]
-        colWidths = [min(width * 8 + 20, 200) for width in colWidths]
         numRows = len(results) 
         popupWidth = min(sum(colWidths) + 100, resultPopup.winfo_screenwidth() - 100)
-        popupHeight = min((40 * numRows) + 120, resultPopup.winfo_screenheight() - 100)
+        popupHeight = min((40 * numRows) + 180, resultPopup.winfo_screenheight() - 100)
         
         popupWidth = max(popupWidth, 200)
-        popupHeight = max(popupHeight, 300)
+        popupHeight = max(popupHeight, 350)
    
     # Center Popup
     screenWidth = resultPopup.winfo_screenwidth()
@@ -215,48 +584,209 @@ def displayResults(results, commandName, *params):
     # Window geometry
     resultPopup.geometry(f"{int(popupWidth)}x{int(popupHeight)}+{int(x)}+{int(y)}")
     
-    # Create main frame with scrollbar
-    mainFrame = ctk.CTkFrame(resultPopup)
-    mainFrame.place(relx=0.5, rely=0.5, anchor="center", relwidth=0.95, relheight=0.85)
-    
-    # Create canvas and scrollbar
-    canvas = ctk.CTkCanvas(mainFrame, bg="#2a2b2e", highlightthickness=0)
-    scrollbar = ctk.CTkScrollbar(mainFrame, orientation="vertical", command=canvas.yview)
-    scrollableFrame = ctk.CTkFrame(canvas, fg_color="#2a2b2e")
-    
-    # Configure canvas scrolling
-    scrollableFrame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-    canvas.create_window((0, 0), window=scrollableFrame, anchor="nw")
-    canvas.configure(yscrollcommand=scrollbar.set)
-    
-    # Pack widgets
-    canvas.pack(side="left", fill="both", expand=True)
-    scrollbar.pack(side="right", fill="y")
+    # Create main frame
+    mainFrame = ctk.CTkFrame(resultPopup, fg_color="#2a2b2e")
+    mainFrame.place(relx=0.5, rely=0.48, anchor="center", relwidth=0.95, relheight=0.78)
     
     # Handle empty results
     if not results or len(results) == 0:
-        resultLabel = ctk.CTkLabel(scrollableFrame, text="No results found", font=("Inter", 12))
+        resultLabel = ctk.CTkLabel(mainFrame, text="No results found", font=("Inter", 12))
         resultLabel.pack(pady=20)
         return
     
+    headers = [str(column) for column in (params if params else results.names)]
+    
+    # Current view: the result set on screen and the row order within it
+    shownResults = results
+    rows = range(len(results))
+    firstRow = 0
+    sortColumn = None
+    sortDescending = False
+    filterJob = None
+    appliedView = ((), None, False)
+    
+    # Export button and row count
+    exportButton = ctk.CTkButton(resultPopup, text="EXPORT CSV", command=lambda: exportResults(resultPopup, shownResults, headers, rows, None if results.complete else results.pushDownQuery(*appliedView)))
+    exportButton.place(relx=0.5, rely=0.93, anchor="center")
+    countLabel = ctk.CTkLabel(resultPopup, text="", font=("Inter", 11), text_color="#a0a0a0")
+    countLabel.place(relx=0.03, rely=0.93, anchor="w")
+    
+    # Create header row, clicking a header sorts by that column
+    headerFrame = ctk.CTkFrame(mainFrame, fg_color="#404040")
+    headerFrame.pack(side="top", fill="x")
     
-    # Create header row
-    headerFrame = ctk.CTkFrame(scrollableFrame, fg_color="#404040")
-    headerFrame.pack(fill="x", pady=(0, 10))
+    headerButtons = []
+    for i, column in enumerate(headers):
+        headerButton = ctk.CTkButton(headerFrame, text=column, font=("Inter", 11, "bold"), text_color="#ffffff", fg_color="#404040", hover_color="#666666", corner_radius=0, width=colWidths[i], command=lambda i=i: sortBy(i))
+        headerButton.grid(row=0, column=i, padx=2)
+        headerButtons.append(headerButton)
     
-    # Add column headers
-    for i, column in enumerate(params if params else results[0]):
-        headerLabel = ctk.CTkLabel(headerFrame, text=str(column), font=("Inter", 11, "bold"), text_color="#ffffff", width=colWidths[i])
-        headerLabel.grid(row=0, column=i, padx=2)
+    # Filter boxes under each header
+    filterFrame = ctk.CTkFrame(mainFrame, fg_color="#2a2b2e")
+    filterFrame.pack(side="top", fill="x", pady=(2, 10))
     
-    # Add data rows
-    for row in results:
-        rowFrame = ctk.CTkFrame(scrollableFrame, fg_color="#2a2b2e")
+    filterEntries = []
+    for i in range(len(headers)):
+        filterEntry = ctk.CTkEntry(filterFrame, placeholder_text="Filter", font=("Inter", 11), width=colWidths[i])
+        filterEntry.grid(row=0, column=i, padx=2)
+        filterEntry.bind("<KeyRelease>", lambda e: scheduleFilter())
+        filterEntry.bind("<Return>", lambda e: applyView())
+        filterEntries.append(filterEntry)
+    
+    # Only the rows that fit on screen get widgets, scrolling changes their text
+    scrollbar = ctk.CTkScrollbar(mainFrame, orientation="vertical")
+    scrollbar.pack(side="right", fill="y")
+    bodyFrame = ctk.CTkFrame(mainFrame, fg_color="#2a2b2e")
+    bodyFrame.pack(side="left", fill="both", expand=True)
+    
+    rowFrames = []
+    cellLabels = []
+    visibleRows = 0
+    
+    def addRow():
+        rowFrame = ctk.CTkFrame(bodyFrame, fg_color="#2a2b2e")
         rowFrame.pack(fill="x", pady=2)
-       
-        for j, value in enumerate(row):
-            cellLabel = ctk.CTkLabel(rowFrame, text=str(value), font=("Inter", 11), text_color="#ffffff", width=colWidths[j])
+        labels = []
+        for j in range(len(results.columns)):
+            cellLabel = ctk.CTkLabel(rowFrame, text="", font=("Inter", 11), text_color="#ffffff", width=colWidths[j])
             cellLabel.grid(row=0, column=j, padx=2)
+            labels.append(cellLabel)
+        rowFrames.append(rowFrame)
+        cellLabels.append(labels)
+    
+    # Match the number of row widgets to the height the body actually has
+    def resizeRows(event=None):
+        nonlocal visibleRows, firstRow
+        if not rowFrames:
+            addRow()
+            rowFrames[0].update_idletasks()
+        rowHeight = rowFrames[0].winfo_reqheight() + 4
+        visibleRows = max(1, bodyFrame.winfo_height() // rowHeight)
+        while len(rowFrames) < visibleRows:
+            addRow()
+        while len(rowFrames) > visibleRows:
+            rowFrames.pop().destroy()
+            cellLabels.pop()
+        firstRow = max(0, min(firstRow, len(rows) - visibleRows))
+        render()
+    
+    # Fill the visible rows from the current view
+    def render():
+        totalRows = len(rows)
+        for r, labels in enumerate(cellLabels):
+            position = firstRow + r
+            for j, cellLabel in enumerate(labels):
+                cellLabel.configure(text=shownResults.text(rows[position], j) if position < totalRows else "")
+        if totalRows:
+            scrollbar.set(firstRow / totalRows, min(firstRow + visibleRows, totalRows) / totalRows)
+        else:
+            scrollbar.set(0, 1)
+        
+        if shownResults.complete:
+            countText = f"{totalRows} of {len(shownResults)} rows"
+        else:
+            countText = f"Only the first {FETCH_LIMIT} rows are loaded, sort, filter or export to use all rows"
+        countLabel.configure(text=countText)
+        
+    # Handle scrollbar movement
+    def scrollTo(action, amount, unit="units"):
+        nonlocal firstRow
+        if action == "moveto":
+            firstRow = int(float(amount) * len(rows))
+        else:
+            firstRow += int(amount) * (visibleRows if unit == "pages" else 1)
+        firstRow = max(0, min(firstRow, len(rows) - visibleRows))
+        render()
+        
+    # Handle the mouse wheel (Button-4/5 on linux)
+    def mouseScroll(event):
+        if event.num == 4 or event.delta > 0:
+            scrollTo("scroll", -3)
+        else:
+            scrollTo("scroll", 3)
+    
+    def cancelFilter():
+        nonlocal filterJob
+        if filterJob is not None:
+            resultPopup.after_cancel(filterJob)
+            filterJob = None
+    
+    # Rebuild the view from the current sort and filters
+    def applyView():
+        nonlocal shownResults, rows, firstRow, appliedView
+        cancelFilter()
+        filters = tuple((j, entry.get().strip()) for j, entry in enumerate(filterEntries) if entry.get().strip())
+        
+        # Keys that don't change the text (shift, arrows, the release of enter) do nothing
+        view = (filters, sortColumn, sortDescending)
+        if view == appliedView:
+            return
+        
+        # Results cut off at the fetch limit have to be sorted and filtered by the server
+        if not results.complete:
+            try:
+                sqlCommand, sqlParams = results.pushDownQuery(filters, sortColumn, sortDescending, FETCH_LIMIT + 1)
+                shownResults = executeCommand(sqlCommand, True, *sqlParams)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to update results: {str(e)}")
+                raise
+            rows = range(len(shownResults))
+        else:
+            order = results.sortedRows(sortColumn, sortDescending) if sortColumn is not None else None
+            rows = results.filterRows(filters, order)
+            
+        appliedView = view
+        firstRow = 0
+        render()
+    
+    # Wait for a pause in typing before filtering
+    def scheduleFilter():
+        nonlocal filterJob
+        cancelFilter()
+        filterJob = resultPopup.after(300, applyView)
+    
+    # Drop a pending filter when the window closes so it never renders to destroyed labels
+    def popupDestroyed(event):
+        if event.widget is resultPopup:
+            cancelFilter()
+    
+    # Sort by a column, clicking the same column again reverses the order
+    def sortBy(columnIndex):
+        nonlocal sortColumn, sortDescending
+        cancelFilter()
+        if sortColumn == columnIndex:
+            sortDescending = not sortDescending
+        else:
+            sortColumn = columnIndex
+            sortDescending = False
+        for i, headerButton in enumerate(headerButtons):
+            arrow = (" ▼" if sortDescending else " ▲") if i == sortColumn else ""
+            headerButton.configure(text=headers[i] + arrow)
+        applyView()
+    
+    scrollbar.configure(command=scrollTo)
+    bodyFrame.bind("<Configure>", resizeRows)
+    resultPopup.bind("<Destroy>", popupDestroyed)
+    resultPopup.bind("<MouseWheel>", mouseScroll)
+    resultPopup.bind("<Button-4>", mouseScroll)
+    resultPopup.bind("<Button-5>", mouseScroll)
+    render()
+
+# Function to export results to a csv file, partial results pass the query to stream from the server
+def exportResults(popup, results, headers, rows=None, query=None):
+    path = filedialog.asksaveasfilename(parent=popup, defaultextension=".csv", filetypes=[("CSV files", "*.csv")])
+    if not path:
+        return
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            if query:
+                exportCommand(file, headers, query[0], *query[1])
+            else:
+                results.writeCsv(file, headers, rows)
+        messagebox.showinfo("Success", "Results exported successfully!")
+    except Exception as e:
+        messagebox.showerror("Error", f"Failed to export results: {str(e)}")
+        raise
                 
 #Function to add widgets to the popup based on the command
 def addWidgets(frame, commandType, command):